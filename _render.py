@@ -0,0 +1,79 @@
+"""
+Markdown rendering of conversations for convert_conversations.py.
+
+Pure functions with no I/O, kept apart from the script so they can be
+profiled, reused or compiled ahead of time (e.g. with mypyc) on their own.
+"""
+
+from typing import List, Tuple
+
+# google-re2 matches in linear time and is API-compatible for the
+# patterns used here
+try:
+    import re2 as _re
+except ImportError:
+    import re as _re
+
+# Markdown template per message sender; anything else is the assistant
+_SENDER_TEMPLATES = {'human': "**You:**\n\n{}\n\n---\n\n"}
+_DEFAULT_TEMPLATE = "**Assistant:**\n\n{}\n\n---\n\n"
+
+# Numbered list item header directly followed by a bullet point
+_LIST_ITEM_RE = _re.compile(r'\n\*\*(\d+)\. "([^"]+)"\*\*\n- ')
+# Same header with a blank line before the bullet, as a backreference template
+_LIST_ITEM_REPLACEMENT = r'\n**\1. "\2"**\n\n- '
+
+
+def render_conversation_parts(title: str, messages: List[Tuple[str, str]]) -> List[str]:
+    """
+    Render a conversation as a list of Markdown fragments.
+
+    This is the per-message hot path of the conversion.
+
+    Args:
+        title: The conversation title, used as the top-level heading
+        messages: The conversation's messages as (sender, stripped text) pairs
+
+    Returns:
+        The title heading followed by one fragment per message
+    """
+    parts = [f"# {title}\n\n"]
+    append = parts.append
+
+    for sender, text in messages:
+        template = _SENDER_TEMPLATES.get(sender, _DEFAULT_TEMPLATE)
+        # Apply pattern modification to the text
+        append(template.format(check_and_modify_text(text)))
+
+    return parts
+
+
+def render_conversation(title: str, messages: List[Tuple[str, str]]) -> str:
+    """
+    Render a conversation as a single Markdown string.
+
+    Public entry point for using the renderer as a library; it is also
+    importable from convert_conversations. The script itself streams
+    render_conversation_parts into the file instead.
+    """
+    return "".join(render_conversation_parts(title, messages))
+
+
+def check_and_modify_text(text: str) -> str:
+    """
+    Check if text contains the specific pattern and modify it by inserting
+    a newline before the last newline in the pattern.
+
+    The pattern matches a numbered list item followed by a bullet point:
+        **1. "Some Title"**
+        - Bullet item
+
+    This fix adds an extra newline to ensure proper Markdown rendering:
+        **1. "Some Title"**
+
+        - Bullet item
+
+    This prevents the bullet point from being visually merged with the
+    numbered list item header in Markdown renderers.
+    """
+    return _LIST_ITEM_RE.sub(_LIST_ITEM_REPLACEMENT, text)
@@ -0,0 +1,94 @@
+"""
+JSON reading and writing shared by the conversation scripts.
+
+ijson and orjson are optional; without them the standard json module
+is used.
+"""
+
+import json
+import mmap
+import re
+from decimal import Decimal
+from typing import Any, Dict, IO, Iterator
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson reads integers outside the 64-bit range as floats. Any run of
+# this many digits could be one, so such input is left to json, which
+# keeps them exact; a false match only costs speed
+_LONG_DIGITS_RE = re.compile(rb'\d{19}')
+
+# Exceptions raised for malformed input by any of the parsers
+if ijson is not None:
+    JSON_ERRORS = (json.JSONDecodeError, ijson.JSONError)
+else:
+    JSON_ERRORS = (json.JSONDecodeError,)
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes, with orjson unless that could change a number."""
+    if orjson is not None and _LONG_DIGITS_RE.search(data) is None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_conversations(f: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the conversations of an open JSON export one at a time.
+
+    With ijson installed the file is parsed incrementally, so only one
+    conversation is held in memory at a time; otherwise the whole file
+    is loaded with orjson, or the standard json module as a last resort.
+    """
+    if ijson is None:
+        return iter(_load_mapped(f))
+    # Numbers are left as ijson parses them: exact ints, and Decimal for
+    # the rest; use_float makes its C backend reject integers beyond 64 bits
+    return ijson.items(f, 'item')
+
+
+def _load_mapped(f: IO[bytes]) -> Any:
+    """
+    Parse a whole JSON file through a read-only memory map.
+
+    orjson parses straight from the mapped pages, so the file is never
+    copied into a bytes object. Files that cannot be mapped (empty files,
+    pipes, in-memory streams) are read normally.
+    """
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return loads(f.read())
+
+    with mm:
+        if orjson is None or _LONG_DIGITS_RE.search(mm) is not None:
+            # json.loads needs bytes, not a buffer
+            return json.loads(mm[:])
+        with memoryview(mm) as view:
+            return orjson.loads(view)
+
+
+def _encode_decimal(obj: Any) -> float:
+    """Write ijson's Decimal numbers as the floats json.load would have read."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize obj as indented UTF-8 JSON."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_encode_decimal, option=orjson.OPT_INDENT_2)
+        except TypeError:
+            # Integers outside the 64-bit range, which only json can write
+            pass
+    return json.dumps(obj, default=_encode_decimal, indent=2, ensure_ascii=False).encode('utf-8')
@@ -1,16 +1,53 @@
 #! python
 
-import json
 import os
-import re
 import argparse
-from typing import List, Dict, Any
+import unicodedata
+from typing import List, Dict, Any, Optional, TextIO, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 
+from conversations_json import JSON_ERRORS, iter_conversations
+# check_and_modify_text and render_conversation are re-exported for
+# callers that use this module as a library
+from _render import check_and_modify_text, render_conversation, render_conversation_parts
 
+# Markdown files are written from a thread pool; the work is I/O bound
+_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Writes allowed in flight before parsing waits for the oldest one
+_MAX_PENDING = _MAX_WORKERS * 2
+_WRITE_BUFFER_SIZE = 1 << 20
+
+
+class _SanitizeTable(dict):
+    """
+    str.translate table that deletes characters not allowed in filenames.
+
+    Keeps the same characters as the regex class [\\w\\s-]: Unicode
+    alphanumerics, underscore, whitespace and hyphen. Entries are computed
+    on first use and cached, so the table only grows with the characters
+    actually seen in titles.
+    """
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        char = chr(codepoint)
+        result = codepoint if char.isalnum() or char in '_-' or char.isspace() else None
+        self[codepoint] = result
+        return result
+
+
+_SANITIZE_TABLE = _SanitizeTable()
+
+
+@lru_cache(maxsize=2048)
 def sanitize_filename(filename: str, max_length: int = 100) -> str:
     """
     Sanitizes a string to be used as a valid filename.
 
+    Results are cached, as titles tend to repeat when the module is used
+    as a library.
+
     Args:
         filename: The string to sanitize
         max_length: Maximum length of the resulting filename (default: 100)
@@ -18,17 +55,28 @@ def sanitize_filename(filename: str, max_length: int = 100) -> str:
     Returns:
         A sanitized filename safe for use on most filesystems
     """
-    clean = re.sub(r'[^\w\s-]', '', filename).strip().replace(' ', '_')
+    clean = filename.translate(_SANITIZE_TABLE).strip().replace(' ', '_')
     return clean[:max_length]
 
 
-def _should_skip_conversation(title: str, messages: List[Dict[str, Any]]) -> bool:
+def _normalize_messages(messages: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """
+    Reduce chat messages to (sender, stripped text) pairs.
+    Each message text is stripped once here and reused by every later step.
+    """
+    return [
+        (message.get('sender', 'Unknown'), (message.get('text') or '').strip())
+        for message in messages
+    ]
+
+
+def _should_skip_conversation(title: str, messages: List[Tuple[str, str]]) -> bool:
     """Check if a conversation should be skipped."""
     if not messages:
         print(f"Skipping conversation '{title}' as it has no messages.")
         return True
 
-    if not title and not any(message.get('text', '').strip() for message in messages):
+    if not title and not any(text for _, text in messages):
         print(f"Skipping conversation '{title}' as it has no title and no messages.")
         return True
 
@@ -56,110 +104,165 @@ def _handle_existing_file(md_filename: str, title: str, overwrite: bool, dry_run
     return True
 
 
-def _write_markdown_content(md_file, title: str, messages: List[Dict[str, Any]]) -> None:
-    """Write the markdown content for a conversation."""
-    md_file.write(f"# {title}\n\n")
+def _open_markdown_file(md_filename: str, overwrite: bool) -> Optional[TextIO]:
+    """
+    Open md_filename for writing without probing for it first.
+    Returns None if the file exists and overwrite is False.
+    """
+    if overwrite:
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    else:
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL
 
-    for message in messages:
-        sender = message.get('sender', 'Unknown')
-        text = message.get('text', '').strip()
+    try:
+        fd = os.open(md_filename, flags, 0o666)
+    except FileExistsError:
+        return None
 
-        # Apply pattern modification to the text
-        text = check_and_modify_text(text)
+    # Markdown is written with explicit '\n' line endings, so skip newline
+    # translation, and use a buffer large enough for most conversations
+    return os.fdopen(fd, 'w', encoding='utf-8', buffering=_WRITE_BUFFER_SIZE, newline='')
 
-        if sender == 'human':
-            md_file.write("**You:**\n\n")
-        else:  # assistant
-            md_file.write("**Assistant:**\n\n")
 
-        md_file.write(f"{text}\n\n---\n\n")
+def _write_markdown_content(md_file, title: str, messages: List[Tuple[str, str]]) -> None:
+    """Write the markdown content for a conversation."""
+    # Hand the fragments to the file's buffer directly, without building
+    # the whole document as one more string first
+    md_file.writelines(render_conversation_parts(title, messages))
 
 
-def json_to_markdown(json_file_path: str, output_dir: str, overwrite: bool = False, dry_run: bool = False) -> None:
+def _plan_conversation(index: int, conversation: Dict[str, Any], path_prefix: str,
+                       overwrite: bool, dry_run: bool) -> Optional[Tuple[str, List[Tuple[str, str]], str]]:
     """
-    Parses a JSON file of conversations and converts each conversation
-    into a separate Markdown file.
-
-    Args:
-        json_file_path: Path to the input JSON file
-        output_dir: Directory where Markdown files will be saved
-        overwrite: If True, overwrite existing files; if False, skip them
-        dry_run: If True, show what would be done without writing files
+    Decide what to do with a single conversation.
+    path_prefix is the output directory including its trailing separator.
+    Returns (title, messages, md_filename) if it should be written, None otherwise.
     """
-    if dry_run:
-        print(f"[DRY RUN] Would create output directory: {output_dir}")
-    elif not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"Created output directory: {output_dir}")
+    title = conversation.get('name', f'conversation_{index+1}')
+    messages = _normalize_messages(conversation.get('chat_messages', []))
 
-    try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            conversations = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: The file '{json_file_path}' was not found.")
-        return
-    except json.JSONDecodeError:
-        print(
-            f"Error: Could not decode JSON from '{json_file_path}'. Please check the file format.")
-        return
+    if _should_skip_conversation(title, messages):
+        return None
 
-    for i, conversation in enumerate(conversations):
-        title = conversation.get('name', f'conversation_{i+1}')
-        messages = conversation.get('chat_messages', [])
+    filename = sanitize_filename(title)
+    md_filename = f"{path_prefix}{filename}.md"
 
-        if _should_skip_conversation(title, messages):
-            continue
+    if dry_run:
+        if _handle_existing_file(md_filename, title, overwrite, dry_run):
+            print(f"[DRY RUN] Would create: {md_filename}")
+        return None
 
-        filename = sanitize_filename(title)
-        md_filename = os.path.join(output_dir, f"{filename}.md")
+    return title, messages, md_filename
 
-        if not _handle_existing_file(md_filename, title, overwrite, dry_run):
-            continue
 
-        if dry_run:
-            print(f"[DRY RUN] Would create: {md_filename}")
-            continue
+def _write_conversation(md_filename: str, title: str, messages: List[Tuple[str, str]],
+                        overwrite: bool) -> bool:
+    """
+    Write a single conversation to md_filename.
+    Returns False if the file already exists and overwrite is False.
+    """
+    md_file = _open_markdown_file(md_filename, overwrite)
+    if md_file is None:
+        return False
 
-        with open(md_filename, 'w', encoding='utf-8') as md_file:
-            _write_markdown_content(md_file, title, messages)
+    with md_file:
+        _write_markdown_content(md_file, title, messages)
 
-        print(f"Successfully created Markdown for '{title}' at '{md_filename}'")
+    return True
 
 
-def check_and_modify_text(text: str) -> str:
+def _write_key(md_filename: str) -> str:
     """
-    Check if text contains the specific pattern and modify it by inserting
-    a newline before the last newline in the pattern.
+    Key under which writes to md_filename are serialized.
 
-    The pattern matches a numbered list item followed by a bullet point:
-        **1. "Some Title"**
-        - Bullet item
+    Case-insensitive filesystems (the macOS and Windows defaults) map
+    paths that differ only in case or Unicode normalization to the same
+    file, so those must not be written at the same time.
+    """
+    return unicodedata.normalize('NFC', md_filename).casefold()
 
-    This fix adds an extra newline to ensure proper Markdown rendering:
-        **1. "Some Title"**
 
-        - Bullet item
+def _report_write(title: str, md_filename: str, future: "Future[bool]") -> None:
+    """Wait for a submitted write and print its outcome."""
+    if future.result():
+        print(f"Successfully created Markdown for '{title}' at '{md_filename}'")
+    else:
+        print(f"Skipping '{title}' - file already exists: {md_filename}")
 
-    This prevents the bullet point from being visually merged with the
-    numbered list item header in Markdown renderers.
+
+def json_to_markdown(json_file_path: str, output_dir: str, overwrite: bool = False, dry_run: bool = False) -> None:
     """
-    # Regex pattern: \n**\d+. "any chars except quotes"**\n-
-    pattern = r'\n\*\*(\d+)\. \"([^"]+)\"\*\*\n- '
+    Parses a JSON file of conversations and converts each conversation
+    into a separate Markdown file.
 
-    # Count matches first for reporting
-    matches = re.findall(pattern, text)
-    if matches:
-        # Use re.sub to replace all occurrences
-        # The replacement function preserves the number and content
-        def replacement(match):
-            number = match.group(1)
-            content = match.group(2)
-            return f'\n**{number}. "{content}"**\n\n- '
+    The Markdown files are written by a pool of threads while the input
+    is still being parsed. At most _MAX_PENDING writes are in flight, so
+    parsing cannot run arbitrarily far ahead of the disk. Write outcomes
+    are reported in input order among themselves; conversations skipped
+    for having no content are reported as soon as they are parsed, so
+    they can appear before earlier writes are reported.
 
-        result = re.sub(pattern, replacement, text)
-        return result
+    When ijson streams the input, a file that is malformed part-way
+    through still produces Markdown for the conversations before the
+    error; they are reported first and the decode error is printed last.
+    Without ijson the whole file is parsed up front and nothing is written.
+
+    Args:
+        json_file_path: Path to the input JSON file
+        output_dir: Directory where Markdown files will be saved
+        overwrite: If True, overwrite existing files; if False, skip them
+        dry_run: If True, show what would be done without writing files
+    """
+    if dry_run:
+        print(f"[DRY RUN] Would create output directory: {output_dir}")
     else:
-        return text
+        os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        f = open(json_file_path, 'rb')
+    except FileNotFoundError:
+        print(f"Error: The file '{json_file_path}' was not found.")
+        return
+
+    # Join the output directory once rather than once per conversation
+    path_prefix = os.path.join(output_dir, '')
+    pending = deque()
+    latest_by_filename = {}
+    decode_failed = False
+
+    with f, ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+        try:
+            for i, conversation in enumerate(iter_conversations(f)):
+                task = _plan_conversation(i, conversation, path_prefix, overwrite, dry_run)
+                if task is None:
+                    continue
+
+                title, messages, md_filename = task
+
+                # Titles can sanitize to the same file; let the earlier
+                # write finish so the outcome matches a sequential run
+                key = _write_key(md_filename)
+                previous = latest_by_filename.get(key)
+                if previous is not None:
+                    previous.result()
+
+                # Each queued write holds its messages; wait for the oldest
+                # one before parsing further once enough are in flight
+                if len(pending) >= _MAX_PENDING:
+                    _report_write(*pending.popleft())
+
+                future = executor.submit(_write_conversation, md_filename, title, messages, overwrite)
+                latest_by_filename[key] = future
+                pending.append((title, md_filename, future))
+        except JSON_ERRORS:
+            decode_failed = True
+
+    while pending:
+        _report_write(*pending.popleft())
+
+    if decode_failed:
+        print(
+            f"Error: Could not decode JSON from '{json_file_path}'. Please check the file format.")
 
 
 if __name__ == '__main__':
@@ -1,9 +1,26 @@
 #! python
 
-import json
 import argparse
 import re
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, IO, Set, Pattern, Union
+
+from conversations_json import JSON_ERRORS, dumps, iter_conversations, loads
+from index_conversations import load_index
+
+
+def _read_indexed_conversations(f: IO[bytes], offsets: Dict[str, List[int]],
+                                uuids: Set[str]) -> List[Dict[str, Any]]:
+    """
+    Read the conversations for uuids from f using the byte ranges in offsets.
+    Conversations are returned in file order.
+    """
+    ranges = sorted(offsets[uuid] for uuid in uuids if uuid in offsets)
+    conversations = []
+    for start, end in ranges:
+        f.seek(start)
+        conversations.append(loads(f.read(end - start)))
+    return conversations
+
 
 def filter_conversations_by_uuid(input_file: str, output_file: str, uuids_to_keep: List[str]) -> None:
     """
@@ -11,69 +28,92 @@ def filter_conversations_by_uuid(input_file: str, output_file: str, uuids_to_kee
     and saves the result to a new JSON file.
     """
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            all_conversations = json.load(f)
+        f = open(input_file, 'rb')
     except FileNotFoundError:
         print(f"Error: The input file '{input_file}' was not found.")
         return
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from '{input_file}'.")
-        return
 
-    # Use a set for efficient lookup
-    uuid_set = set(uuids_to_keep)
+    # Use a set for efficient lookup; found UUIDs are removed from it so
+    # reading can stop as soon as every requested conversation is found
+    remaining = set(uuids_to_keep)
+    filtered_conversations = []
+
+    # An up-to-date index from index_conversations.py lets us read just the
+    # requested conversations instead of scanning the file
+    offsets = load_index(input_file)
 
     # Filter conversations based on the provided UUIDs
-    filtered_conversations = [
-        conv for conv in all_conversations if conv.get('uuid') in uuid_set
-    ]
+    with f:
+        try:
+            if offsets is not None:
+                filtered_conversations = _read_indexed_conversations(f, offsets, remaining)
+            else:
+                for conv in iter_conversations(f):
+                    uuid = conv.get('uuid')
+                    if uuid in remaining:
+                        filtered_conversations.append(conv)
+                        remaining.discard(uuid)
+                        if not remaining:
+                            break
+        except JSON_ERRORS:
+            print(f"Error: Could not decode JSON from '{input_file}'.")
+            return
 
     if not filtered_conversations:
         print("Warning: No conversations found with the specified UUIDs.")
         return
 
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(filtered_conversations, f, indent=2, ensure_ascii=False)
+        with open(output_file, 'wb') as f:
+            f.write(dumps(filtered_conversations))
         print(f"Successfully filtered {len(filtered_conversations)} conversations and saved to '{output_file}'.")
     except IOError as e:
         print(f"Error writing to file '{output_file}': {e}")
 
 
-def filter_conversations_by_name(input_file: str, output_file: str, name_pattern: str) -> None:
+def filter_conversations_by_name(input_file: str, output_file: str,
+                                 name_pattern: Union[str, Pattern[str]]) -> None:
     """
     Loads conversations from a JSON file, filters them by a name pattern (regex),
     and saves the result to a new JSON file.
+
+    A string pattern is compiled case-insensitively. An already compiled
+    pattern is used as is, with its own flags.
     """
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            all_conversations = json.load(f)
+        f = open(input_file, 'rb')
     except FileNotFoundError:
         print(f"Error: The input file '{input_file}' was not found.")
         return
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from '{input_file}'.")
-        return
-
-    try:
-        pattern = re.compile(name_pattern, re.IGNORECASE)
-    except re.error as e:
-        print(f"Error: Invalid regex pattern '{name_pattern}': {e}")
-        return
 
-    # Filter conversations based on the name pattern
-    filtered_conversations = [
-        conv for conv in all_conversations
-        if pattern.search(conv.get('name', ''))
-    ]
+    with f:
+        if isinstance(name_pattern, re.Pattern):
+            pattern = name_pattern
+        else:
+            try:
+                pattern = re.compile(name_pattern, re.IGNORECASE)
+            except re.error as e:
+                print(f"Error: Invalid regex pattern '{name_pattern}': {e}")
+                return
+
+        # Filter conversations based on the name pattern
+        search = pattern.search
+        try:
+            filtered_conversations = [
+                conv for conv in iter_conversations(f)
+                if search(conv.get('name') or '')
+            ]
+        except JSON_ERRORS:
+            print(f"Error: Could not decode JSON from '{input_file}'.")
+            return
 
     if not filtered_conversations:
         print("Warning: No conversations found matching the pattern.")
         return
 
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(filtered_conversations, f, indent=2, ensure_ascii=False)
+        with open(output_file, 'wb') as f:
+            f.write(dumps(filtered_conversations))
         print(f"Successfully filtered {len(filtered_conversations)} conversations and saved to '{output_file}'.")
     except IOError as e:
         print(f"Error writing to file '{output_file}': {e}")
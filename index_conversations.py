@@ -0,0 +1,133 @@
+#! python
+
+import json
+import os
+import re
+import argparse
+from typing import Dict, List, Optional
+
+# Whitespace allowed between JSON tokens
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+
+
+def index_path(input_file: str) -> str:
+    """Return the path of the sidecar index file for input_file."""
+    return input_file + '.idx'
+
+
+def _scan_offsets(text: str) -> Dict[str, List[int]]:
+    """
+    Map each conversation UUID to the [start, end) range of its JSON object.
+
+    text must be the export decoded as latin-1, so that character offsets
+    are byte offsets into the file. UUIDs are ASCII and survive that
+    decoding unchanged; other strings do not matter here.
+    """
+    decoder = json.JSONDecoder()
+    skip = _WHITESPACE_RE.match
+    offsets = {}
+
+    pos = skip(text, 0).end()
+    if text[pos:pos + 1] != '[':
+        raise ValueError("expected a JSON array of conversations")
+    pos = skip(text, pos + 1).end()
+
+    if text[pos:pos + 1] == ']':
+        return offsets
+
+    while True:
+        conversation, end = decoder.raw_decode(text, pos)
+        uuid = conversation.get('uuid') if isinstance(conversation, dict) else None
+        if uuid is not None:
+            # Keep the first occurrence, like the scanning filter does
+            offsets.setdefault(uuid, [pos, end])
+
+        pos = skip(text, end).end()
+        delimiter = text[pos:pos + 1]
+        if delimiter == ']':
+            return offsets
+        if delimiter != ',':
+            raise ValueError(f"expected ',' or ']' at offset {pos}")
+        pos = skip(text, pos + 1).end()
+
+
+def build_index(input_file: str) -> None:
+    """
+    Scans a conversations JSON file once and writes a sidecar index that
+    maps each conversation UUID to its byte range in the file.
+
+    filter_conversations_by_uuid uses the index, while it is up to date,
+    to read only the requested conversations instead of the whole file.
+    """
+    try:
+        with open(input_file, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            text = f.read().decode('latin-1')
+    except FileNotFoundError:
+        print(f"Error: The input file '{input_file}' was not found.")
+        return
+
+    try:
+        offsets = _scan_offsets(text)
+    except ValueError:
+        print(f"Error: Could not decode JSON from '{input_file}'.")
+        return
+
+    index = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'offsets': offsets,
+    }
+
+    output_file = index_path(input_file)
+    try:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        print(f"Successfully indexed {len(offsets)} conversations and saved to '{output_file}'.")
+    except IOError as e:
+        print(f"Error writing to file '{output_file}': {e}")
+
+
+def load_index(input_file: str) -> Optional[Dict[str, List[int]]]:
+    """
+    Return the UUID -> [start, end) byte ranges for input_file, or None if
+    there is no index or it no longer matches the file's size and mtime.
+    """
+    try:
+        stat = os.stat(input_file)
+        with open(index_path(input_file), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(index, dict):
+        return None
+    if index.get('size') != stat.st_size or index.get('mtime_ns') != stat.st_mtime_ns:
+        return None
+
+    offsets = index.get('offsets')
+    if not isinstance(offsets, dict) or not all(_is_byte_range(r) for r in offsets.values()):
+        return None
+
+    return offsets
+
+
+def _is_byte_range(value) -> bool:
+    """Check that value is a [start, end] pair of integers."""
+    return (isinstance(value, list) and len(value) == 2
+            and all(isinstance(n, int) and not isinstance(n, bool) for n in value))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Index Claude conversations by UUID to speed up repeated UUID filtering',
+        prog='index_conversations.py'
+    )
+    parser.add_argument(
+        'input_file',
+        help='Path to the JSON file containing conversations (the index is written next to it)'
+    )
+
+    args = parser.parse_args()
+
+    build_index(args.input_file)
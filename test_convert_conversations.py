@@ -5,12 +5,34 @@ import json
 import os
 import tempfile
 import shutil
+import io
+import re
+import threading
+import time
+from contextlib import redirect_stdout
+from unittest import mock
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+import _render
+import convert_conversations
 from convert_conversations import (
     sanitize_filename,
     check_and_modify_text,
     json_to_markdown,
+    render_conversation,
+    render_conversation_parts,
+    _normalize_messages,
     _should_skip_conversation,
-    _handle_existing_file
+    _handle_existing_file,
+    _open_markdown_file
 )
 
 
@@ -48,6 +70,14 @@ class TestSanitizeFilename(unittest.TestCase):
         """Test that unicode characters are removed."""
         self.assertEqual(sanitize_filename("Hello🌍World"), "HelloWorld")
 
+    def test_preserve_unicode_letters(self):
+        """Test that non-ASCII letters and digits are kept."""
+        self.assertEqual(sanitize_filename("Café ½ naïve"), "Café_½_naïve")
+
+    def test_preserve_underscore_and_inner_whitespace(self):
+        """Test that underscores and non-space whitespace are kept."""
+        self.assertEqual(sanitize_filename("a_b\tc"), "a_b\tc")
+
 
 class TestCheckAndModifyText(unittest.TestCase):
     """Test cases for check_and_modify_text function."""
@@ -68,6 +98,33 @@ class TestCheckAndModifyText(unittest.TestCase):
         self.assertIn('**1. "First"**\n\n- ', result)
         self.assertIn('**2. "Second"**\n\n- ', result)
 
+    def test_backslashes_in_title_preserved(self):
+        """Test that backslashes in the matched title are copied literally."""
+        input_text = 'Text\n**12. "C:\\path\\1"**\n- Item'
+        expected = 'Text\n**12. "C:\\path\\1"**\n\n- Item'
+        self.assertEqual(check_and_modify_text(input_text), expected)
+
+    @unittest.skipUnless(re2, "google-re2 is not installed")
+    def test_re2_matches_stdlib_re(self):
+        """Test that the list-item pattern and template behave the same under re2 and re."""
+        pattern = _render._LIST_ITEM_RE.pattern
+        replacement = _render._LIST_ITEM_REPLACEMENT
+        texts = [
+            'Some text\n**1. "Title Here"**\n- Item one',
+            'Text\n**1. "First"**\n- Item\n**2. "Second"**\n- Item',
+            'Text\n**12. "C:\\path\\1"**\n- Item',
+            'Text\n**3. "Multi\nline"**\n- Item',
+            'Text\n**4. "Unclosed**\n- Item',
+            '**1. Title without quotes**\n- Item',
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    re2.compile(pattern).sub(replacement, text),
+                    re.compile(pattern).sub(replacement, text)
+                )
+                self.assertEqual(check_and_modify_text(text), re.compile(pattern).sub(replacement, text))
+
     def test_no_pattern_unchanged(self):
         """Test that text without pattern is unchanged."""
         input_text = "Just some regular text without the pattern"
@@ -81,6 +138,37 @@ class TestCheckAndModifyText(unittest.TestCase):
         self.assertEqual(result, input_text)
 
 
+class TestRenderConversation(unittest.TestCase):
+    """Test cases for render_conversation function."""
+
+    def test_title_and_messages(self):
+        """Test rendering of the title and both sender roles."""
+        messages = [("human", "Hello"), ("assistant", "Hi there")]
+        self.assertEqual(
+            render_conversation("Greeting", messages),
+            "# Greeting\n\n"
+            "**You:**\n\nHello\n\n---\n\n"
+            "**Assistant:**\n\nHi there\n\n---\n\n"
+        )
+
+    def test_unknown_sender_rendered_as_assistant(self):
+        """Test that messages from other senders use the assistant header."""
+        result = render_conversation("T", [("Unknown", "No sender")])
+        self.assertIn("**Assistant:**\n\nNo sender", result)
+
+    def test_list_item_fix_applied(self):
+        """Test that message text goes through check_and_modify_text."""
+        result = render_conversation("T", [("assistant", 'x\n**1. "A"**\n- b')])
+        self.assertIn('**1. "A"**\n\n- b', result)
+
+    def test_parts_join_to_document(self):
+        """Test that the fragments are the title plus one per message."""
+        messages = [("human", "Hello"), ("assistant", "Hi there")]
+        parts = render_conversation_parts("Greeting", messages)
+        self.assertEqual(len(parts), 3)
+        self.assertEqual("".join(parts), render_conversation("Greeting", messages))
+
+
 class TestHelperFunctions(unittest.TestCase):
     """Test cases for helper functions."""
 
@@ -90,14 +178,31 @@ class TestHelperFunctions(unittest.TestCase):
 
     def test_should_skip_no_content(self):
         """Test skipping conversations with no title and no message content."""
-        messages = [{"text": "  "}, {"text": ""}]
+        messages = _normalize_messages([{"text": "  "}, {"text": ""}])
         self.assertTrue(_should_skip_conversation("", messages))
 
+    def test_should_not_skip_untitled_with_content(self):
+        """Test not skipping untitled conversations that have message content."""
+        messages = _normalize_messages([{"text": " "}, {}, {"text": None}, {"text": " Hi "}])
+        self.assertFalse(_should_skip_conversation("", messages))
+
     def test_should_not_skip_valid(self):
         """Test not skipping valid conversations."""
-        messages = [{"text": "Hello"}]
+        messages = [("human", "Hello")]
         self.assertFalse(_should_skip_conversation("Title", messages))
 
+    def test_normalize_messages(self):
+        """Test reduction of messages to (sender, stripped text) pairs."""
+        messages = [
+            {"sender": "human", "text": "  Hello  "},
+            {"sender": "assistant", "text": None},
+            {}
+        ]
+        self.assertEqual(
+            _normalize_messages(messages),
+            [("human", "Hello"), ("assistant", ""), ("Unknown", "")]
+        )
+
     def test_handle_existing_file_no_overwrite(self):
         """Test that existing files are skipped when overwrite is False."""
         with tempfile.NamedTemporaryFile(delete=False) as tf:
@@ -123,6 +228,31 @@ class TestHelperFunctions(unittest.TestCase):
         result = _handle_existing_file("/nonexistent/file.md", "Test", overwrite=False, dry_run=False)
         self.assertTrue(result)
 
+    def test_open_markdown_file_existing_no_overwrite(self):
+        """Test that an existing file is left alone when overwrite is False."""
+        with tempfile.NamedTemporaryFile('w', delete=False) as tf:
+            tf.write("original")
+            temp_file = tf.name
+        try:
+            self.assertIsNone(_open_markdown_file(temp_file, overwrite=False))
+            with open(temp_file, 'r') as f:
+                self.assertEqual(f.read(), "original")
+        finally:
+            os.unlink(temp_file)
+
+    def test_open_markdown_file_existing_with_overwrite(self):
+        """Test that an existing file is truncated when overwrite is True."""
+        with tempfile.NamedTemporaryFile('w', delete=False) as tf:
+            tf.write("original")
+            temp_file = tf.name
+        try:
+            md_file = _open_markdown_file(temp_file, overwrite=True)
+            self.assertIsNotNone(md_file)
+            md_file.close()
+            self.assertEqual(os.path.getsize(temp_file), 0)
+        finally:
+            os.unlink(temp_file)
+
 
 class TestJsonToMarkdown(unittest.TestCase):
     """Test cases for json_to_markdown function."""
@@ -168,6 +298,33 @@ class TestJsonToMarkdown(unittest.TestCase):
         self.assertIn("**Assistant:**", content)
         self.assertIn("Hi there", content)
 
+    def test_markdown_layout(self):
+        """Test the exact Markdown layout of a converted conversation."""
+        conversations = [
+            {
+                "name": "Layout",
+                "chat_messages": [
+                    {"sender": "human", "text": "  Question  "},
+                    {"sender": "assistant", "text": "Answer"}
+                ]
+            }
+        ]
+
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            json.dump(conversations, f)
+
+        json_to_markdown(self.input_file, self.output_dir)
+
+        with open(os.path.join(self.output_dir, "Layout.md"), 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        self.assertEqual(
+            content,
+            "# Layout\n\n"
+            "**You:**\n\nQuestion\n\n---\n\n"
+            "**Assistant:**\n\nAnswer\n\n---\n\n"
+        )
+
     def test_skip_empty_conversations(self):
         """Test that empty conversations are skipped."""
         conversations = [
@@ -267,6 +424,99 @@ class TestJsonToMarkdown(unittest.TestCase):
         self.assertIn("# Test", content)
         self.assertNotEqual(content, "Modified content")
 
+    def test_many_conversations(self):
+        """Test that every conversation is written when using the thread pool."""
+        conversations = [
+            {
+                "name": f"Conversation {i}",
+                "chat_messages": [{"sender": "human", "text": f"Message {i}"}]
+            }
+            for i in range(50)
+        ]
+
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            json.dump(conversations, f)
+
+        json_to_markdown(self.input_file, self.output_dir)
+
+        self.assertEqual(len(os.listdir(self.output_dir)), 50)
+        with open(os.path.join(self.output_dir, "Conversation_42.md"), 'r', encoding='utf-8') as f:
+            self.assertIn("Message 42", f.read())
+
+    def test_bounded_pending_writes(self):
+        """Test that a small in-flight limit still writes and reports everything in order."""
+        conversations = [
+            {
+                "name": f"Conversation {i}",
+                "chat_messages": [{"sender": "human", "text": f"Message {i}"}]
+            }
+            for i in range(20)
+        ]
+
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            json.dump(conversations, f)
+
+        stdout = io.StringIO()
+        with mock.patch('convert_conversations._MAX_PENDING', 2), redirect_stdout(stdout):
+            json_to_markdown(self.input_file, self.output_dir)
+
+        self.assertEqual(len(os.listdir(self.output_dir)), 20)
+        reported = [line.split("'")[1] for line in stdout.getvalue().splitlines()
+                    if line.startswith("Successfully")]
+        self.assertEqual(reported, [f"Conversation {i}" for i in range(20)])
+
+    def test_duplicate_titles(self):
+        """Test that conversations sharing a filename behave like a sequential run."""
+        conversations = [
+            {"name": "Same", "chat_messages": [{"sender": "human", "text": "First"}]},
+            {"name": "Same", "chat_messages": [{"sender": "human", "text": "Second"}]}
+        ]
+
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            json.dump(conversations, f)
+
+        output_file = os.path.join(self.output_dir, "Same.md")
+
+        json_to_markdown(self.input_file, self.output_dir)
+        with open(output_file, 'r', encoding='utf-8') as f:
+            self.assertIn("First", f.read())
+
+        json_to_markdown(self.input_file, self.output_dir, overwrite=True)
+        with open(output_file, 'r', encoding='utf-8') as f:
+            self.assertIn("Second", f.read())
+
+    def test_titles_differing_in_case_written_in_turn(self):
+        """Test that filenames differing only in case are not written at the same time."""
+        conversations = [
+            {"name": "Python help", "chat_messages": [{"sender": "human", "text": "First"}]},
+            {"name": "python help", "chat_messages": [{"sender": "human", "text": "Second"}]}
+        ]
+
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            json.dump(conversations, f)
+
+        events = []
+        lock = threading.Lock()
+        write_conversation = convert_conversations._write_conversation
+
+        def recording_write(md_filename, title, messages, overwrite):
+            with lock:
+                events.append(("start", title))
+            # Give a concurrent write for the other title time to start
+            time.sleep(0.05)
+            result = write_conversation(md_filename, title, messages, overwrite)
+            with lock:
+                events.append(("end", title))
+            return result
+
+        with mock.patch('convert_conversations._write_conversation', recording_write):
+            json_to_markdown(self.input_file, self.output_dir)
+
+        self.assertEqual(events, [
+            ("start", "Python help"), ("end", "Python help"),
+            ("start", "python help"), ("end", "python help")
+        ])
+
     def test_missing_input_file(self):
         """Test handling of missing input file."""
         # Should not raise exception, just print error
@@ -285,6 +535,61 @@ class TestJsonToMarkdown(unittest.TestCase):
         self.assertTrue(os.path.exists(self.output_dir))
         self.assertEqual(len(os.listdir(self.output_dir)), 0)
 
+    def _write_truncated_input(self):
+        """Write two complete conversations followed by a truncated one."""
+        conversations = [
+            {"name": "First", "chat_messages": [{"sender": "human", "text": "One"}]},
+            {"name": "Second", "chat_messages": [{"sender": "human", "text": "Two"}]}
+        ]
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(conversations)[:-1] + ', {"name": "Third", "chat_')
+
+    @unittest.skipUnless(ijson, "ijson is not installed")
+    def test_truncated_input_streaming(self):
+        """Test that streaming keeps conversations before the error and reports it last."""
+        self._write_truncated_input()
+
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            json_to_markdown(self.input_file, self.output_dir)
+
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["First.md", "Second.md"])
+        lines = stdout.getvalue().splitlines()
+        self.assertTrue(lines[-1].startswith("Error: Could not decode JSON"))
+        self.assertEqual(sum(line.startswith("Successfully") for line in lines), 2)
+
+    @unittest.skipUnless(ijson, "ijson is not installed")
+    def test_large_integers_streaming(self):
+        """Test that integers beyond 64 bits do not stop streaming."""
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write('[{"name": "First", "n": 123456789012345678901234567890,'
+                    ' "chat_messages": [{"sender": "human", "text": "One"}]},'
+                    ' {"name": "Second", "n": 1.5,'
+                    ' "chat_messages": [{"sender": "human", "text": "Two"}]}]')
+
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            json_to_markdown(self.input_file, self.output_dir)
+
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["First.md", "Second.md"])
+        self.assertNotIn("Error", stdout.getvalue())
+
+    @unittest.skipIf(ijson, "ijson is installed")
+    def test_truncated_input_whole_file(self):
+        """Test that without streaming a truncated file produces no Markdown."""
+        self._write_truncated_input()
+
+        json_to_markdown(self.input_file, self.output_dir)
+
+        self.assertEqual(len(os.listdir(self.output_dir)), 0)
+
+    def test_empty_input_file(self):
+        """Test handling of an empty input file."""
+        open(self.input_file, 'w').close()
+
+        json_to_markdown(self.input_file, self.output_dir)
+        self.assertEqual(len(os.listdir(self.output_dir)), 0)
+
     def test_filename_sanitization_in_conversion(self):
         """Test that special characters in conversation names are sanitized."""
         conversations = [
@@ -3,117 +3,196 @@
 import unittest
 import json
 import os
+import io
+import re
 import tempfile
-import shutil
+from pathlib import Path
+from unittest import mock
 from filter_conversations import filter_conversations_by_uuid, filter_conversations_by_name
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+    _loads = json.loads
+
+
+_TEST_CONVERSATIONS = [
+    {
+        "uuid": "uuid-1",
+        "name": "Python Tutorial",
+        "chat_messages": [{"sender": "human", "text": "Hello"}]
+    },
+    {
+        "uuid": "uuid-2",
+        "name": "JavaScript Guide",
+        "chat_messages": [{"sender": "human", "text": "Hi"}]
+    },
+    {
+        "uuid": "uuid-3",
+        "name": "Python Advanced Topics",
+        "chat_messages": [{"sender": "human", "text": "Hey"}]
+    },
+    {
+        "uuid": "uuid-4",
+        "name": "Ruby Programming",
+        "chat_messages": [{"sender": "human", "text": "Greetings"}]
+    }
+]
+
+# Serialized once; every test reads the same input
+_INPUT_BYTES = _dumps(_TEST_CONVERSATIONS)
+
+# Exact output expected when filtering by uuid-2: indented, non-ASCII kept
+_EXPECTED_UUID2 = json.dumps([_TEST_CONVERSATIONS[1]], indent=2, ensure_ascii=False).encode('utf-8')
+
+
+class _CapturingBytesIO(io.BytesIO):
+    """BytesIO whose contents stay readable after it is closed."""
+
+    captured = None
+
+    def close(self):
+        self.captured = self.getvalue()
+        super().close()
+
 
 class TestFilterConversations(unittest.TestCase):
     """Test cases for filter_conversations.py"""
 
     def setUp(self):
-        """Set up test fixtures before each test method."""
+        """Give each test method a private directory for the files it writes."""
+        # Only a handful of known files are ever created, so they are
+        # unlinked one by one and the directory removed with os.rmdir
         self.test_dir = tempfile.mkdtemp()
-        self.test_conversations = [
-            {
-                "uuid": "uuid-1",
-                "name": "Python Tutorial",
-                "chat_messages": [{"sender": "human", "text": "Hello"}]
-            },
-            {
-                "uuid": "uuid-2",
-                "name": "JavaScript Guide",
-                "chat_messages": [{"sender": "human", "text": "Hi"}]
-            },
-            {
-                "uuid": "uuid-3",
-                "name": "Python Advanced Topics",
-                "chat_messages": [{"sender": "human", "text": "Hey"}]
-            },
-            {
-                "uuid": "uuid-4",
-                "name": "Ruby Programming",
-                "chat_messages": [{"sender": "human", "text": "Greetings"}]
-            }
-        ]
         self.input_file = os.path.join(self.test_dir, "input.json")
         self.output_file = os.path.join(self.test_dir, "output.json")
 
-        # Write test data
-        with open(self.input_file, 'w', encoding='utf-8') as f:
-            json.dump(self.test_conversations, f)
-
     def tearDown(self):
-        """Clean up after each test method."""
-        shutil.rmtree(self.test_dir)
-
-    def test_filter_by_single_uuid(self):
-        """Test filtering by a single UUID."""
-        filter_conversations_by_uuid(self.input_file, self.output_file, ["uuid-1"])
-
-        with open(self.output_file, 'r', encoding='utf-8') as f:
-            result = json.load(f)
-
-        self.assertEqual(len(result), 1)
-        self.assertEqual(result[0]["uuid"], "uuid-1")
-        self.assertEqual(result[0]["name"], "Python Tutorial")
-
-    def test_filter_by_multiple_uuids(self):
-        """Test filtering by multiple UUIDs."""
-        filter_conversations_by_uuid(self.input_file, self.output_file, ["uuid-1", "uuid-3"])
-
-        with open(self.output_file, 'r', encoding='utf-8') as f:
-            result = json.load(f)
-
-        self.assertEqual(len(result), 2)
-        uuids = [conv["uuid"] for conv in result]
-        self.assertIn("uuid-1", uuids)
-        self.assertIn("uuid-3", uuids)
-
-    def test_filter_by_nonexistent_uuid(self):
-        """Test filtering by UUID that doesn't exist."""
-        filter_conversations_by_uuid(self.input_file, self.output_file, ["uuid-999"])
-
-        # Should not create output file when no matches
-        self.assertFalse(os.path.exists(self.output_file))
+        """Remove the files a test method may have written and its directory."""
+        for name in ("input.json", "output.json", "invalid.json"):
+            try:
+                os.unlink(os.path.join(self.test_dir, name))
+            except FileNotFoundError:
+                pass
+        os.rmdir(self.test_dir)
+
+    def _write_input(self):
+        """Write the input fixture for tests that read it from disk."""
+        with open(self.input_file, 'wb') as f:
+            f.write(_INPUT_BYTES)
+
+    def _run_filter(self, filter_fn, *args, conversations=None):
+        """
+        Run filter_fn against in-memory input and output buffers.
+
+        The module's open() and load_index() are patched so no file is
+        touched, not even a stray input.json.idx in the cwd. Returns the
+        parsed output, or None if the filter did not write any output.
+        """
+        input_bytes = _INPUT_BYTES if conversations is None else _dumps(conversations)
+        buffers = {
+            'input.json': io.BytesIO(input_bytes),
+            'output.json': _CapturingBytesIO(),
+        }
+
+        def fake_open(path, mode='r', *open_args, **open_kwargs):
+            try:
+                return buffers[os.path.basename(path)]
+            except KeyError:
+                raise FileNotFoundError(path) from None
+
+        with mock.patch('filter_conversations.open', side_effect=fake_open, create=True), \
+                mock.patch('filter_conversations.load_index', return_value=None):
+            filter_fn('input.json', 'output.json', *args)
+
+        output = buffers['output.json'].captured
+        return None if output is None else _loads(output)
+
+    def test_filter_by_uuids(self):
+        """Test filtering by a single, several and nonexistent UUIDs."""
+        cases = [
+            (["uuid-1"], ["uuid-1"]),
+            (["uuid-1", "uuid-3"], ["uuid-1", "uuid-3"]),
+            (["uuid-999"], None),
+        ]
+        for uuids, expected in cases:
+            with self.subTest(uuids=uuids):
+                result = self._run_filter(filter_conversations_by_uuid, uuids)
+
+                if expected is None:
+                    # Should not write output when no matches
+                    self.assertIsNone(result)
+                else:
+                    self.assertEqual(
+                        result, [conv for conv in _TEST_CONVERSATIONS if conv["uuid"] in expected])
+
+    def test_filter_large_uuid_list(self):
+        """Test filtering a large export by many UUIDs."""
+        conversations = [
+            {"uuid": f"uuid-{i}", "name": f"Conversation {i}", "chat_messages": []}
+            for i in range(1000)
+        ]
+        uuids = [f"uuid-{i}" for i in range(0, 1000, 10)]
 
-    def test_filter_by_name_pattern_simple(self):
-        """Test filtering by simple name pattern."""
-        filter_conversations_by_name(self.input_file, self.output_file, "Python")
+        result = self._run_filter(filter_conversations_by_uuid, uuids,
+                                  conversations=conversations)
 
-        with open(self.output_file, 'r', encoding='utf-8') as f:
-            result = json.load(f)
+        self.assertEqual([conv["uuid"] for conv in result], uuids)
 
+    def test_filter_by_name_patterns(self):
+        """Test filtering by simple, case-insensitive, regex and non-matching patterns."""
+        python_uuids = ["uuid-1", "uuid-3"]
+        cases = [
+            ("Python", python_uuids),
+            ("python", python_uuids),
+            ("^Python", python_uuids),
+            ("NonExistent", None),
+        ]
+        for pattern, expected in cases:
+            with self.subTest(pattern=pattern):
+                result = self._run_filter(filter_conversations_by_name, pattern)
+
+                if expected is None:
+                    # Should not write output when no matches
+                    self.assertIsNone(result)
+                else:
+                    self.assertEqual([conv["uuid"] for conv in result], expected)
+
+    def test_filter_by_name_pattern_compiled(self):
+        """Test filtering by a pre-compiled pattern, keeping its own flags."""
+        result = self._run_filter(filter_conversations_by_name, re.compile("^python", re.IGNORECASE))
         self.assertEqual(len(result), 2)
-        names = [conv["name"] for conv in result]
-        self.assertIn("Python Tutorial", names)
-        self.assertIn("Python Advanced Topics", names)
 
-    def test_filter_by_name_pattern_case_insensitive(self):
-        """Test that name pattern filtering is case-insensitive."""
-        filter_conversations_by_name(self.input_file, self.output_file, "python")
+        result = self._run_filter(filter_conversations_by_name, re.compile("^python"))
+        self.assertIsNone(result)
 
-        with open(self.output_file, 'r', encoding='utf-8') as f:
-            result = json.load(f)
+    def test_filter_by_name_pattern_invalid(self):
+        """Test that an invalid regex pattern writes no output."""
+        result = self._run_filter(filter_conversations_by_name, "Python(")
 
-        self.assertEqual(len(result), 2)
+        self.assertIsNone(result)
 
-    def test_filter_by_name_pattern_regex(self):
-        """Test filtering by regex pattern."""
-        filter_conversations_by_name(self.input_file, self.output_file, "^Python")
+    def test_filter_by_name_pattern_missing_name(self):
+        """Test that conversations without a name are skipped, not an error."""
+        conversations = _TEST_CONVERSATIONS + [
+            {"uuid": "uuid-5", "name": None, "chat_messages": []},
+            {"uuid": "uuid-6", "chat_messages": []}
+        ]
 
-        with open(self.output_file, 'r', encoding='utf-8') as f:
-            result = json.load(f)
+        result = self._run_filter(filter_conversations_by_name, "Python",
+                                  conversations=conversations)
 
         self.assertEqual(len(result), 2)
 
-    def test_filter_by_name_pattern_no_match(self):
-        """Test filtering by pattern with no matches."""
-        filter_conversations_by_name(self.input_file, self.output_file, "NonExistent")
-
-        # Should not create output file when no matches
-        self.assertFalse(os.path.exists(self.output_file))
-
     def test_filter_missing_input_file(self):
         """Test behavior with missing input file."""
         filter_conversations_by_uuid("nonexistent.json", self.output_file, ["uuid-1"])
@@ -132,19 +211,47 @@ class TestFilterConversations(unittest.TestCase):
         # Should not create output file
         self.assertFalse(os.path.exists(self.output_file))
 
+    @unittest.skipUnless(ijson, "ijson is not installed")
+    def test_filter_truncated_json_streaming(self):
+        """Test that a file truncated after some matches writes no output."""
+        truncated_file = os.path.join(self.test_dir, "invalid.json")
+        with open(truncated_file, 'wb') as f:
+            f.write(_INPUT_BYTES[:-10])
+
+        filter_conversations_by_name(truncated_file, self.output_file, "Python")
+
+        # Should not create output file, even though matches were read
+        self.assertFalse(os.path.exists(self.output_file))
+
+    @unittest.skipUnless(ijson, "ijson is not installed")
+    def test_filter_fractional_numbers_streaming(self):
+        """Test that numbers streamed as Decimal are written back as the same floats."""
+        conversations = [{"uuid": "uuid-1", "name": "Python", "cost": 0.1, "score": 1.5e-7}]
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            json.dump(conversations, f)
+
+        filter_conversations_by_name(self.input_file, self.output_file, "Python")
+
+        self.assertEqual(json.loads(Path(self.output_file).read_bytes()), conversations)
+
+    def test_filter_preserves_large_integers(self):
+        """Test that integers beyond 64 bits are copied exactly."""
+        with open(self.input_file, 'wb') as f:
+            f.write(b'[{"uuid": "a", "name": "Python", "n": 123456789012345678901234567890},'
+                    b' {"uuid": "b", "name": "Ruby", "n": -9223372036854775809}]')
+
+        filter_conversations_by_name(self.input_file, self.output_file, "Python")
+
+        expected = [{"uuid": "a", "name": "Python", "n": 123456789012345678901234567890}]
+        self.assertEqual(json.loads(Path(self.output_file).read_bytes()), expected)
+
     def test_filter_preserves_structure(self):
         """Test that filtering preserves conversation structure."""
-        filter_conversations_by_uuid(self.input_file, self.output_file, ["uuid-2"])
+        self._write_input()
 
-        with open(self.output_file, 'r', encoding='utf-8') as f:
-            result = json.load(f)
-
-        original = self.test_conversations[1]
-        filtered = result[0]
+        filter_conversations_by_uuid(self.input_file, self.output_file, ["uuid-2"])
 
-        self.assertEqual(filtered["uuid"], original["uuid"])
-        self.assertEqual(filtered["name"], original["name"])
-        self.assertEqual(filtered["chat_messages"], original["chat_messages"])
+        self.assertEqual(Path(self.output_file).read_bytes(), _EXPECTED_UUID2)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import os
+import tempfile
+import shutil
+from index_conversations import build_index, load_index, index_path
+from filter_conversations import filter_conversations_by_uuid
+
+
+class TestIndexConversations(unittest.TestCase):
+    """Test cases for index_conversations.py"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_conversations = [
+            {
+                "uuid": "uuid-1",
+                "name": "Traduire une expression française",
+                "chat_messages": [{"sender": "human", "text": "Ça va ?"}]
+            },
+            {
+                "uuid": "uuid-2",
+                "name": "JavaScript Guide",
+                "chat_messages": [{"sender": "human", "text": "Hi"}]
+            },
+            {
+                "uuid": "uuid-3",
+                "name": "Emoji 🌍",
+                "chat_messages": [{"sender": "human", "text": "Hey"}]
+            }
+        ]
+        self.input_file = os.path.join(self.test_dir, "input.json")
+        self.output_file = os.path.join(self.test_dir, "output.json")
+
+        # Write test data the way Claude exports it: indented, non-ASCII kept
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            json.dump(self.test_conversations, f, indent=2, ensure_ascii=False)
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        shutil.rmtree(self.test_dir)
+
+    def test_build_index_byte_ranges(self):
+        """Test that every indexed range holds exactly its conversation."""
+        build_index(self.input_file)
+
+        offsets = load_index(self.input_file)
+        self.assertEqual(set(offsets), {"uuid-1", "uuid-2", "uuid-3"})
+
+        with open(self.input_file, 'rb') as f:
+            data = f.read()
+
+        for conv in self.test_conversations:
+            start, end = offsets[conv["uuid"]]
+            self.assertEqual(json.loads(data[start:end]), conv)
+
+    def test_build_index_empty_array(self):
+        """Test indexing an export without conversations."""
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write(" [ ] ")
+
+        build_index(self.input_file)
+
+        self.assertEqual(load_index(self.input_file), {})
+
+    def test_build_index_invalid_json(self):
+        """Test that no index is written for invalid JSON."""
+        with open(self.input_file, 'w') as f:
+            f.write("[{\"uuid\": \"uuid-1\"} {")
+
+        build_index(self.input_file)
+
+        self.assertFalse(os.path.exists(index_path(self.input_file)))
+
+    def test_build_index_missing_input_file(self):
+        """Test behavior with missing input file."""
+        missing = os.path.join(self.test_dir, "nonexistent.json")
+
+        build_index(missing)
+
+        self.assertFalse(os.path.exists(index_path(missing)))
+
+    def test_load_index_missing(self):
+        """Test that a missing index is reported as None."""
+        self.assertIsNone(load_index(self.input_file))
+
+    def test_load_index_stale(self):
+        """Test that an index is ignored once the export changes."""
+        build_index(self.input_file)
+
+        with open(self.input_file, 'a', encoding='utf-8') as f:
+            f.write("\n")
+
+        self.assertIsNone(load_index(self.input_file))
+
+    def test_filter_with_index(self):
+        """Test that UUID filtering gives the same result with an index."""
+        filter_conversations_by_uuid(self.input_file, self.output_file, ["uuid-3", "uuid-1"])
+        with open(self.output_file, 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+
+        build_index(self.input_file)
+        os.remove(self.output_file)
+
+        filter_conversations_by_uuid(self.input_file, self.output_file, ["uuid-3", "uuid-1"])
+        with open(self.output_file, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+
+        self.assertEqual(result, expected)
+        self.assertEqual([conv["uuid"] for conv in result], ["uuid-1", "uuid-3"])
+
+    def test_filter_with_index_duplicate_uuid(self):
+        """Test that the index keeps the first of duplicate UUIDs, like a scan."""
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            json.dump([{"uuid": "a", "name": "first"}, {"uuid": "a", "name": "second"}], f)
+
+        filter_conversations_by_uuid(self.input_file, self.output_file, ["a"])
+        with open(self.output_file, 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+
+        build_index(self.input_file)
+        os.remove(self.output_file)
+
+        filter_conversations_by_uuid(self.input_file, self.output_file, ["a"])
+        with open(self.output_file, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+
+        self.assertEqual(result, expected)
+        self.assertEqual([conv["name"] for conv in result], ["first"])
+
+    def test_load_index_malformed_offsets(self):
+        """Test that an up-to-date index with malformed offsets is ignored."""
+        build_index(self.input_file)
+        with open(index_path(self.input_file), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+        for offsets in ({"uuid-1": 5}, {"uuid-1": [1]}, {"uuid-1": ["0", "9"]}, [[0, 9]]):
+            with self.subTest(offsets=offsets):
+                index['offsets'] = offsets
+                with open(index_path(self.input_file), 'w', encoding='utf-8') as f:
+                    json.dump(index, f)
+
+                self.assertIsNone(load_index(self.input_file))
+
+    def test_filter_with_index_nonexistent_uuid(self):
+        """Test filtering an indexed export by a UUID that doesn't exist."""
+        build_index(self.input_file)
+
+        filter_conversations_by_uuid(self.input_file, self.output_file, ["uuid-999"])
+
+        self.assertFalse(os.path.exists(self.output_file))
+
+
+if __name__ == '__main__':
+    unittest.main()